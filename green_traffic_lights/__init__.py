@@ -10,6 +10,11 @@ from .config import Config, STATIC_FOLDER
 from .extensions import db
 from .routes import bp as routes_bp
 from .services.aggregation import aggregate_passes_for_day
+from .services.migrations import (
+    create_missing_indexes,
+    migrate_speed_profiles,
+    speed_profile_is_packed,
+)
 
 
 def create_app() -> Flask:
@@ -21,6 +26,11 @@ def create_app() -> Flask:
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        if not speed_profile_is_packed():
+            app.logger.warning(
+                "traffic_light_pass.speed_profile is still JSON; run "
+                "`flask migrate-speed-profiles` to switch to packed storage"
+            )
 
     app.register_blueprint(routes_bp)
     Compress(app)
@@ -42,4 +52,19 @@ def create_app() -> Flask:
 
         aggregate_passes_for_day(target_day)
 
+    @app.cli.command("migrate-speed-profiles")
+    @click.option("--batch-size", default=500, show_default=True, help="Rows converted per batch")
+    def migrate_speed_profiles_command(batch_size: int) -> None:
+        """Convert stored JSON speed profiles to the packed binary format."""
+
+        converted = migrate_speed_profiles(batch_size)
+        click.echo(f"Converted {converted} speed profiles")
+
+    @app.cli.command("create-indexes")
+    def create_indexes_command() -> None:
+        """Create model indexes missing from existing tables."""
+
+        created = create_missing_indexes()
+        click.echo(f"Created {created} indexes")
+
     return app
@@ -15,13 +15,49 @@ class Config:
     """Default configuration for the traffic lights application."""
 
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", f"sqlite:///{_DEFAULT_DB_PATH}")
+    # Comma-separated read replica URLs, exposed as ``replica_<n>`` binds.
+    SQLALCHEMY_BINDS = {
+        f"replica_{position}": url.strip()
+        for position, url in enumerate(
+            url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+        )
+    }
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SEND_FILE_MAX_AGE_DEFAULT = timedelta(days=30)
 
+    _replica_cooldown_raw = os.getenv("DATABASE_REPLICA_COOLDOWN_SECONDS")
+    try:
+        DATABASE_REPLICA_COOLDOWN_SECONDS = (
+            float(_replica_cooldown_raw) if _replica_cooldown_raw is not None else None
+        )
+    except ValueError:
+        DATABASE_REPLICA_COOLDOWN_SECONDS = None
+
     GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
     TRAFFIC_LIGHTS_FILE = Path(os.getenv("TRAFFIC_LIGHTS_FILE", _DEFAULT_TRAFFIC_LIGHTS_FILE))
 
+    # Directory of per-region datasets described by a ``regions.json`` manifest.
+    # When set, it takes precedence over ``TRAFFIC_LIGHTS_FILE`` for validation.
+    _regions_dir_raw = os.getenv("TRAFFIC_LIGHTS_DIR")
+    TRAFFIC_LIGHTS_DIR = Path(_regions_dir_raw) if _regions_dir_raw else None
+
+    _region_idle_raw = os.getenv("TRAFFIC_LIGHTS_REGION_IDLE_SECONDS")
+    try:
+        TRAFFIC_LIGHTS_REGION_IDLE_SECONDS = (
+            float(_region_idle_raw) if _region_idle_raw is not None else None
+        )
+    except ValueError:
+        TRAFFIC_LIGHTS_REGION_IDLE_SECONDS = None
+
+    _region_budget_raw = os.getenv("TRAFFIC_LIGHTS_REGION_MAX_LIGHTS")
+    try:
+        TRAFFIC_LIGHTS_REGION_MAX_LIGHTS = (
+            int(_region_budget_raw) if _region_budget_raw is not None else None
+        )
+    except ValueError:
+        TRAFFIC_LIGHTS_REGION_MAX_LIGHTS = None
+
     _distance_raw = os.getenv("TRAFFIC_LIGHT_MAX_DISTANCE_METERS")
     try:
         TRAFFIC_LIGHT_MAX_DISTANCE_METERS = (
@@ -29,3 +65,25 @@ class Config:
         )
     except ValueError:
         TRAFFIC_LIGHT_MAX_DISTANCE_METERS = None
+
+    # Admission control for /api/click, applied per worker process. The
+    # in-flight cap needs threaded workers (gunicorn --threads / gthread).
+    _max_in_flight_raw = os.getenv("INGESTION_MAX_IN_FLIGHT")
+    try:
+        INGESTION_MAX_IN_FLIGHT = int(_max_in_flight_raw) if _max_in_flight_raw is not None else None
+    except ValueError:
+        INGESTION_MAX_IN_FLIGHT = None
+
+    _latency_threshold_raw = os.getenv("INGESTION_LATENCY_THRESHOLD_MS")
+    try:
+        INGESTION_LATENCY_THRESHOLD_MS = (
+            float(_latency_threshold_raw) if _latency_threshold_raw is not None else None
+        )
+    except ValueError:
+        INGESTION_LATENCY_THRESHOLD_MS = None
+
+    _retry_after_raw = os.getenv("INGESTION_RETRY_AFTER_SECONDS")
+    try:
+        INGESTION_RETRY_AFTER_SECONDS = int(_retry_after_raw) if _retry_after_raw is not None else None
+    except ValueError:
+        INGESTION_RETRY_AFTER_SECONDS = None
@@ -0,0 +1,178 @@
+"""Primary/replica routing for the shared SQLAlchemy session.
+
+Read replicas are configured as ``replica_<n>`` entries in ``SQLALCHEMY_BINDS``.
+Service functions opt in with ``@replica_read``: while they run, plain SELECTs
+go to a replica picked round-robin, while flushes and INSERT/UPDATE/DELETE
+statements always use the primary. A replica that raises a database error is
+skipped for ``DATABASE_REPLICA_COOLDOWN_SECONDS`` and the call is retried on
+the primary.
+
+Reads stay on the primary when read-your-writes is needed: once the session
+has pending or flushed changes, inside ``require_primary()``, or when the
+request sends ``X-Read-Your-Writes: 1``.
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc as sa_exc
+
+REPLICA_BIND_PREFIX = "replica_"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+DEFAULT_REPLICA_COOLDOWN_SECONDS = 30.0
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+_ROUND_ROBIN = itertools.count()
+_UNHEALTHY_UNTIL: dict[str, float] = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica chosen by ``replica_read``."""
+
+    def get_bind(
+        self,
+        mapper: Any | None = None,
+        clause: Any | None = None,
+        bind: sa.engine.Engine | sa.engine.Connection | None = None,
+        **kwargs: Any,
+    ) -> sa.engine.Engine | sa.engine.Connection:
+        if bind is None and not self._flushing and not _is_write(clause):
+            replica_key = g.get("_db_replica_key") if has_app_context() else None
+            if replica_key is not None and not self._has_writes():
+                engine = self._db.engines.get(replica_key)
+                if engine is not None:
+                    return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _has_writes(self) -> bool:
+        return bool(self.info.get("has_writes") or self.new or self.dirty or self.deleted)
+
+
+def _is_write(clause: Any) -> bool:
+    return isinstance(clause, (sa.Insert, sa.Update, sa.Delete))
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _mark_session_written(session: RoutingSession, flush_context: Any) -> None:
+    session.info["has_writes"] = True
+
+
+@sa.event.listens_for(RoutingSession, "after_commit")
+def _mark_session_committed(session: RoutingSession) -> None:
+    # Committed rows may not have reached the replicas yet, so keep reading
+    # from the primary for the rest of the session (i.e. the request).
+    if session.info.get("has_writes"):
+        session.info["committed_writes"] = True
+
+
+@sa.event.listens_for(RoutingSession, "after_rollback")
+def _clear_session_written(session: RoutingSession) -> None:
+    session.info["has_writes"] = session.info.get("committed_writes", False)
+
+
+def get_replica_binds(binds: dict[str, Any]) -> list[str]:
+    """Return the replica bind keys from a ``SQLALCHEMY_BINDS`` mapping."""
+
+    return sorted(key for key in binds if key and key.startswith(REPLICA_BIND_PREFIX))
+
+
+def _get_cooldown() -> float:
+    raw = current_app.config.get("DATABASE_REPLICA_COOLDOWN_SECONDS")
+    try:
+        cooldown = float(raw) if raw is not None else DEFAULT_REPLICA_COOLDOWN_SECONDS
+        if cooldown < 0 or not math.isfinite(cooldown):
+            raise ValueError
+    except (TypeError, ValueError):
+        current_app.logger.warning(
+            "Invalid DATABASE_REPLICA_COOLDOWN_SECONDS=%r, falling back to default", raw
+        )
+        return DEFAULT_REPLICA_COOLDOWN_SECONDS
+    return cooldown
+
+
+def _pick_replica() -> Optional[str]:
+    """Pick the next healthy replica round-robin, or ``None`` for the primary."""
+
+    replicas = get_replica_binds(current_app.config.get("SQLALCHEMY_BINDS") or {})
+    if not replicas:
+        return None
+
+    now = time.monotonic()
+    start = next(_ROUND_ROBIN)
+    with _HEALTH_LOCK:
+        for offset in range(len(replicas)):
+            key = replicas[(start + offset) % len(replicas)]
+            if _UNHEALTHY_UNTIL.get(key, 0.0) <= now:
+                _UNHEALTHY_UNTIL.pop(key, None)
+                return key
+    return None
+
+
+def _mark_unhealthy(replica_key: str) -> None:
+    cooldown = _get_cooldown()
+    with _HEALTH_LOCK:
+        _UNHEALTHY_UNTIL[replica_key] = time.monotonic() + cooldown
+    current_app.logger.warning(
+        "Read replica %s failed; routing reads to other binds for %.0fs",
+        replica_key,
+        cooldown,
+        exc_info=True,
+    )
+
+
+def _read_your_writes_requested() -> bool:
+    if g.get("_db_require_primary"):
+        return True
+    return has_request_context() and request.headers.get(READ_YOUR_WRITES_HEADER) == "1"
+
+
+@contextmanager
+def require_primary() -> Iterator[None]:
+    """Keep every read inside the block on the primary database."""
+
+    previous = g.get("_db_require_primary", False)
+    g._db_require_primary = True
+    try:
+        yield
+    finally:
+        g._db_require_primary = previous
+
+
+def replica_read(func: _F) -> _F:
+    """Route the reads of a read-only service function to a replica."""
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        db = current_app.extensions["sqlalchemy"]
+
+        if g.get("_db_replica_key") is not None or _read_your_writes_requested():
+            return func(*args, **kwargs)
+
+        replica_key = _pick_replica()
+        if replica_key is None or db.session()._has_writes():
+            return func(*args, **kwargs)
+
+        g._db_replica_key = replica_key
+        try:
+            return func(*args, **kwargs)
+        except sa_exc.DBAPIError:
+            _mark_unhealthy(replica_key)
+            db.session.rollback()
+        finally:
+            g._db_replica_key = None
+
+        return func(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
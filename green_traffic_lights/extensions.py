@@ -2,5 +2,7 @@ from __future__ import annotations
 
 from flask_sqlalchemy import SQLAlchemy
 
+from .db_routing import RoutingSession
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
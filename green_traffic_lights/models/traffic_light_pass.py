@@ -3,6 +3,7 @@ from __future__ import annotations
 from sqlalchemy import Enum, func
 
 from ..extensions import db
+from .types import PackedFloatArray
 
 
 class TrafficLightPass(db.Model):
@@ -12,7 +13,7 @@ class TrafficLightPass(db.Model):
     click_event_id = db.Column(db.Integer, db.ForeignKey("click_event.id"), nullable=False)
     light_identifier = db.Column(db.String(64), nullable=False)
     pass_color = db.Column(Enum("green", "red", name="traffic_light_pass_color"), nullable=False)
-    speed_profile = db.Column(db.JSON, nullable=True)
+    speed_profile = db.Column(PackedFloatArray(), nullable=True)
     pass_timestamp = db.Column(db.DateTime(timezone=True), nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
 
@@ -7,6 +7,12 @@ from ..extensions import db
 
 class TrafficLightRange(db.Model):
     __tablename__ = "traffic_light_range"
+    __table_args__ = (
+        # Backs keyset pagination of range history on (day, start_time, id).
+        db.Index(
+            "ix_traffic_light_range_history", "light_identifier", "day", "start_time", "id"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     light_identifier = db.Column(db.String(64), nullable=False)
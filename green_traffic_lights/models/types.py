@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from collections.abc import Sequence
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+# Blob layout: one kind byte, one flags byte, then the (optionally compressed)
+# payload. Numeric kinds store little-endian floats; ``_KIND_JSON`` stores UTF-8
+# JSON for payloads that are not flat lists of numbers.
+_KIND_JSON = 0
+_KIND_FLOAT32 = 1
+_KIND_FLOAT16 = 2
+_FLAG_XOR_DELTA = 0x01
+_FLAG_ZLIB = 0x02
+
+# kind -> (struct float code, struct unsigned code of the same width)
+_NUMERIC_FORMATS = {
+    _KIND_FLOAT32: ("f", "I"),
+    _KIND_FLOAT16: ("e", "H"),
+}
+_DTYPE_KINDS = {"float32": _KIND_FLOAT32, "float16": _KIND_FLOAT16}
+# Significant digits each width holds; decoded values are trimmed to these so
+# a stored 32.1 reads back as 32.1 rather than 32.099998474121094.
+_SIGNIFICANT_DIGITS = {_KIND_FLOAT32: 7, _KIND_FLOAT16: 4}
+
+
+def is_numeric_profile(value: Any) -> bool:
+    """Return True for a flat list of int/float values (bools excluded)."""
+
+    return isinstance(value, list) and all(
+        type(item) is float or type(item) is int for item in value
+    )
+
+
+def _xor_delta(words: Sequence[int]) -> list[int]:
+    # XOR of consecutive bit patterns zeroes the shared sign/exponent bits of
+    # similar values, which is what lets zlib shrink slowly varying speeds.
+    previous = 0
+    encoded = []
+    for word in words:
+        encoded.append(word ^ previous)
+        previous = word
+    return encoded
+
+
+def _xor_undelta(words: Sequence[int]) -> list[int]:
+    previous = 0
+    decoded = []
+    for word in words:
+        previous ^= word
+        decoded.append(previous)
+    return decoded
+
+
+def _decode_numeric(kind: int, flags: int, payload: bytes) -> list[float]:
+    float_code, word_code = _NUMERIC_FORMATS[kind]
+    count = len(payload) // struct.calcsize(float_code)
+
+    if flags & _FLAG_XOR_DELTA:
+        words = _xor_undelta(struct.unpack(f"<{count}{word_code}", payload))
+        payload = struct.pack(f"<{count}{word_code}", *words)
+
+    digits = _SIGNIFICANT_DIGITS[kind]
+    values = struct.unpack(f"<{count}{float_code}", payload)
+    return [float(f"{value:.{digits}g}") for value in values]
+
+
+def _unwrap(blob: bytes) -> tuple[int, int, bytes]:
+    kind, flags = blob[0], blob[1]
+    payload = blob[2:]
+    if flags & _FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    return kind, flags, payload
+
+
+class PackedProfile(Sequence):
+    """Numeric profile read from the database, decoded on first access."""
+
+    __slots__ = ("_blob", "_values")
+
+    def __init__(self, blob: bytes) -> None:
+        self._blob = blob
+        self._values: Optional[list[float]] = None
+
+    @property
+    def blob(self) -> bytes:
+        return self._blob
+
+    def tolist(self) -> list[float]:
+        if self._values is None:
+            kind, flags, payload = _unwrap(self._blob)
+            self._values = _decode_numeric(kind, flags, payload)
+        return self._values
+
+    def __getitem__(self, index: Any) -> Any:
+        return self.tolist()[index]
+
+    def __len__(self) -> int:
+        return len(self.tolist())
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.tolist())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PackedProfile):
+            return self._blob == other._blob
+        if isinstance(other, list):
+            return self.tolist() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._blob)
+
+    def __repr__(self) -> str:
+        return f"PackedProfile({self.tolist()!r})"
+
+
+class PackedFloatArray(TypeDecorator):
+    """Store numeric lists as packed float arrays, anything else as JSON.
+
+    Values are stored as ``float32`` (or ``float16``), so ints come back as
+    floats and precision is limited to the chosen width (7 or 4 significant
+    digits). ``delta`` XORs consecutive float bit patterns before packing;
+    ``compress`` applies zlib when it actually makes the blob smaller.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dtype: str = "float32", delta: bool = True, compress: bool = True) -> None:
+        super().__init__()
+        if dtype not in _DTYPE_KINDS:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected float32 or float16")
+        self.dtype = dtype
+        self.delta = delta
+        self.compress = compress
+
+    def encode(self, value: Any) -> bytes:
+        if isinstance(value, PackedProfile):
+            return value.blob
+
+        kind, flags, payload = _KIND_JSON, 0, b""
+        if is_numeric_profile(value):
+            kind = _DTYPE_KINDS[self.dtype]
+            float_code, word_code = _NUMERIC_FORMATS[kind]
+            try:
+                payload = struct.pack(f"<{len(value)}{float_code}", *value)
+            except (OverflowError, struct.error):
+                # Out of range for the packed width; keep the exact values.
+                kind = _KIND_JSON
+            else:
+                if self.delta and len(value) > 1:
+                    words = struct.unpack(f"<{len(value)}{word_code}", payload)
+                    payload = struct.pack(f"<{len(value)}{word_code}", *_xor_delta(words))
+                    flags |= _FLAG_XOR_DELTA
+
+        if kind == _KIND_JSON:
+            payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+        if self.compress:
+            compressed = zlib.compress(payload)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= _FLAG_ZLIB
+
+        return bytes((kind, flags)) + payload
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        return self.encode(value)
+
+    def result_processor(self, dialect: Any, coltype: Any) -> Any:
+        # Skip the ``LargeBinary`` processor: on drivers without native bytes
+        # (psycopg2) it calls ``bytes()`` on every value, which breaks the JSON
+        # values of rows that have not been migrated yet.
+        def process(value: Any) -> Any:
+            return self.process_result_value(value, dialect)
+
+        return process
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        if value is None:
+            return None
+
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            # Rows not yet converted by ``flask migrate-speed-profiles`` still
+            # come back as JSON text (SQLite) or decoded objects (psycopg2),
+            # where a decoded JSON string is not JSON text itself.
+            if isinstance(value, str) and dialect.name == "sqlite":
+                return json.loads(value)
+            return value
+
+        blob = bytes(value)
+        if blob[0] != _KIND_JSON:
+            return PackedProfile(blob)
+
+        _, _, payload = _unwrap(blob)
+        return json.loads(payload)
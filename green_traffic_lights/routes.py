@@ -1,17 +1,42 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import json
 import math
+import time
 from dataclasses import dataclass
 from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
-
-from flask import Blueprint, current_app, jsonify, request, send_from_directory
+from typing import Any, Iterator, Optional
+
+import sqlalchemy as sa
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    request,
+    send_from_directory,
+    stream_with_context,
+)
 
 from .extensions import db
 from .models import ClickEvent, TrafficLightPass
-from .services.aggregation import get_ranges_for_light
+from .models.types import is_numeric_profile
+from .services.migrations import speed_profile_is_packed
+from .services.admission import (
+    get_admission_stats,
+    record_commit_latency,
+    release_click,
+    try_admit_click,
+)
+from .services.aggregation import get_range_history, get_ranges_for_light, normalize_day
+from .services.range_encoding import (
+    BINARY_MIMETYPE,
+    COMPACT_JSON_MIMETYPE,
+    encode_ranges_binary,
+    encode_ranges_compact,
+)
 from .services.traffic_lights import _get_traffic_lights_path, validate_click_distance
 
 bp = Blueprint("routes", __name__)
@@ -26,6 +51,13 @@ STATIC_IMMUTABLE_EXTS = (
     ".ico",
     ".txt",
 )
+HISTORY_DEFAULT_LIMIT = 500
+HISTORY_MAX_LIMIT = 5000
+RANGE_FORMATS = {
+    "json": "application/json",
+    "compact": COMPACT_JSON_MIMETYPE,
+    "binary": BINARY_MIMETYPE,
+}
 
 
 @dataclass
@@ -63,6 +95,51 @@ def _parse_iso_date(date_raw: str) -> Optional[date]:
         return None
 
 
+def _encode_history_cursor(day: date, start_time: datetime, range_id: int) -> str:
+    raw = json.dumps([day.isoformat(), start_time.isoformat(), range_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _parse_history_cursor(cursor_raw: str) -> Optional[tuple[date, datetime, int]]:
+    try:
+        padded = cursor_raw + "=" * (-len(cursor_raw) % 4)
+        day_raw, start_raw, range_id = json.loads(base64.urlsafe_b64decode(padded))
+        start_time = datetime.fromisoformat(start_raw)
+        if not isinstance(range_id, int):
+            raise ValueError("Cursor id must be an integer")
+    except (binascii.Error, TypeError, ValueError):
+        return None
+
+    day = _parse_iso_date(day_raw)
+    if day is None:
+        return None
+    # Stored times are UTC; SQLite hands them back naive and drops offsets on
+    # bind, so normalize any other offset to UTC before comparing.
+    if start_time.tzinfo is None:
+        return day, start_time.replace(tzinfo=timezone.utc), range_id
+    return day, start_time.astimezone(timezone.utc), range_id
+
+
+def _negotiate_range_format() -> Optional[str]:
+    """Pick the ranges representation from ``format=`` or the Accept header.
+
+    An explicit ``format`` parameter wins; unknown values yield ``None``. Without
+    it, the compact encodings are only chosen when the client asks for their
+    media types more strongly than plain JSON, so browsers keep getting JSON.
+    """
+
+    format_param = request.args.get("format")
+    if format_param:
+        normalized = format_param.strip().lower()
+        return normalized if normalized in RANGE_FORMATS else None
+
+    best = request.accept_mimetypes.best_match(list(RANGE_FORMATS.values()), "application/json")
+    for name, mimetype in RANGE_FORMATS.items():
+        if mimetype == best:
+            return name
+    return "json"
+
+
 def _ensure_json_safe(value: Any) -> Any:
     """Validate that a value can be JSON-serialized (e.g., for DB JSON columns)."""
 
@@ -93,7 +170,9 @@ def _parse_inferred_pass(data: Any) -> Optional[InferredPassData]:
     speed_profile = data.get("speed_profile")
     if speed_profile is not None and not isinstance(speed_profile, (dict, list, float, int, str)):
         raise InferredPassError("Invalid speed_profile format")
-    if speed_profile is not None:
+    # Numeric lists are packed as floats and need no JSON round-trip; only the
+    # JSON fallback path has to be validated.
+    if speed_profile is not None and not is_numeric_profile(speed_profile):
         speed_profile = _ensure_json_safe(speed_profile)
 
     pass_timestamp_raw = data.get("pass_timestamp") or data.get("timestamp")
@@ -124,22 +203,36 @@ def save_click_to_db(
     click_event = ClickEvent(lat=lat, lon=lon, speed=speed, timestamp=timestamp)
     db.session.add(click_event)
 
+    legacy_profile = False
     if inferred_pass is not None:
+        speed_profile = inferred_pass.speed_profile
+        if speed_profile is not None and not speed_profile_is_packed():
+            # ``flask migrate-speed-profiles`` has not run yet: write plain JSON
+            # that the old column accepts instead of the packed blob.
+            speed_profile = sa.literal(speed_profile, sa.JSON)
+            legacy_profile = True
+
         traffic_pass = TrafficLightPass(
             click_event=click_event,
             light_identifier=inferred_pass.light_identifier,
             pass_color=inferred_pass.pass_color,
-            speed_profile=inferred_pass.speed_profile,
+            speed_profile=speed_profile,
             pass_timestamp=inferred_pass.pass_timestamp,
         )
         db.session.add(traffic_pass)
 
+    commit_started = time.perf_counter()
     try:
         db.session.commit()
     except Exception:
         db.session.rollback()
         current_app.logger.exception("Failed to persist click event")
+        if legacy_profile:
+            # The migration may have run since this worker started.
+            speed_profile_is_packed(refresh=True)
         raise
+    finally:
+        record_commit_latency(time.perf_counter() - commit_started)
 
 
 def _get_html_dir() -> str:
@@ -227,8 +320,14 @@ def api_light_ranges(light_identifier: str) -> Any:
     Query params:
     - ``day`` (optional): UTC date in ``YYYY-MM-DD`` format; defaults to the
       previous UTC day if omitted to mirror aggregation defaults.
+    - ``format`` (optional): ``json`` (default), ``compact`` or ``binary``; the
+      Accept header is consulted when omitted.
     """
 
+    range_format = _negotiate_range_format()
+    if range_format is None:
+        return jsonify({"error": "Invalid format; expected json, compact or binary"}), 400
+
     day_param = request.args.get("day")
     target_day: Optional[date] = None
 
@@ -238,8 +337,30 @@ def api_light_ranges(light_identifier: str) -> Any:
             return jsonify({"error": "Invalid day format; expected YYYY-MM-DD"}), 400
         target_day = parsed_day
 
+    # Resolve the default day once so the queried day and the compact header
+    # cannot disagree around UTC midnight.
+    normalized_day = normalize_day(target_day)
     normalized_light_identifier = light_identifier.strip()
-    ranges = get_ranges_for_light(normalized_light_identifier, target_day)
+    ranges = get_ranges_for_light(normalized_light_identifier, normalized_day)
+
+    if range_format == "compact":
+        response = current_app.response_class(
+            json.dumps(
+                encode_ranges_compact(normalized_light_identifier, normalized_day, ranges),
+                separators=(",", ":"),
+            ),
+            mimetype=COMPACT_JSON_MIMETYPE,
+        )
+        response.vary.add("Accept")
+        return response
+
+    if range_format == "binary":
+        response = current_app.response_class(
+            encode_ranges_binary(normalized_light_identifier, normalized_day, ranges),
+            mimetype=BINARY_MIMETYPE,
+        )
+        response.vary.add("Accept")
+        return response
 
     payload = [
         {
@@ -252,7 +373,87 @@ def api_light_ranges(light_identifier: str) -> Any:
         for range_ in ranges
     ]
 
-    return jsonify({"light_identifier": normalized_light_identifier, "ranges": payload})
+    response = jsonify({"light_identifier": normalized_light_identifier, "ranges": payload})
+    response.vary.add("Accept")
+    return response
+
+
+@bp.route("/api/lights/<light_identifier>/ranges/history", methods=["GET"])
+def api_light_range_history(light_identifier: str) -> Any:
+    """Page through a light's ranges across several days.
+
+    Query params:
+    - ``from`` / ``to`` (required): inclusive UTC dates in ``YYYY-MM-DD`` format.
+    - ``limit`` (optional): page size, 1..``HISTORY_MAX_LIMIT`` (default
+      ``HISTORY_DEFAULT_LIMIT``).
+    - ``cursor`` (optional): ``next_cursor`` from the previous page.
+
+    Pages use keyset pagination on ``(day, start_time, id)``, so deep pages
+    cost the same as the first. The body is streamed row by row; ``next_cursor``
+    comes last and is ``null`` on the final page.
+    """
+
+    start_day = _parse_iso_date(request.args.get("from", ""))
+    end_day = _parse_iso_date(request.args.get("to", ""))
+    if start_day is None or end_day is None:
+        return jsonify({"error": "Invalid from/to format; expected YYYY-MM-DD"}), 400
+    if start_day > end_day:
+        return jsonify({"error": "from must not be after to"}), 400
+
+    limit_raw = request.args.get("limit")
+    try:
+        limit = int(limit_raw) if limit_raw is not None else HISTORY_DEFAULT_LIMIT
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        return jsonify({"error": f"Invalid limit; expected 1..{HISTORY_MAX_LIMIT}"}), 400
+
+    after = None
+    cursor_raw = request.args.get("cursor")
+    if cursor_raw:
+        after = _parse_history_cursor(cursor_raw)
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    normalized_light_identifier = light_identifier.strip()
+    # Fetch one extra row to learn whether another page exists without a COUNT.
+    rows = get_range_history(normalized_light_identifier, start_day, end_day, limit + 1, after)
+
+    def generate() -> Iterator[str]:
+        identifier_json = json.dumps(normalized_light_identifier)
+        last_key = None
+        # Close the server-side cursor even when the client disconnects and
+        # the generator is closed mid-page, including right after this chunk.
+        try:
+            yield f'{{"light_identifier":{identifier_json},"ranges":['
+
+            for position, row in enumerate(rows):
+                if position == limit:
+                    break
+                item = {
+                    "light_identifier": normalized_light_identifier,
+                    "color": row.color,
+                    "start_time": row.start_time.isoformat(),
+                    "end_time": row.end_time.isoformat(),
+                    "day": row.day.isoformat(),
+                }
+                yield ("," if position else "") + json.dumps(item, separators=(",", ":"))
+                last_key = (row.day, row.start_time, row.id)
+            else:
+                # The extra row never showed up, so this is the last page.
+                last_key = None
+        finally:
+            rows.close()
+
+        next_cursor = _encode_history_cursor(*last_key) if last_key is not None else None
+        yield f'],"next_cursor":{json.dumps(next_cursor)}}}'
+
+    response = current_app.response_class(
+        stream_with_context(generate()), mimetype="application/json"
+    )
+    # A response closed before the first chunk never starts the generator.
+    response.call_on_close(rows.close)
+    return response
 
 
 @bp.route("/maps-config.js")
@@ -319,11 +520,33 @@ def api_click() -> Any:
         payload, status = validation_result
         return jsonify(payload), status
 
-    save_click_to_db(lat, lon, speed, timestamp, inferred_pass)
+    # Shed load before touching the database so a slow primary cannot tie up
+    # every worker; clicks with an inferred pass are kept the longest.
+    retry_after = try_admit_click(prioritized=inferred_pass is not None)
+    if retry_after is not None:
+        response = jsonify({"error": "Server is busy, please retry later"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    try:
+        save_click_to_db(lat, lon, speed, timestamp, inferred_pass)
+    finally:
+        release_click()
 
     return jsonify({"status": "ok"}), 200
 
 
+@bp.route("/api/metrics/admission", methods=["GET"])
+def api_admission_metrics() -> Any:
+    """Expose this worker's click admission counters and commit latency."""
+
+    response = jsonify(get_admission_stats())
+    response.cache_control.no_store = True
+    response.cache_control.max_age = 0
+    return response
+
+
 @bp.after_request
 def add_cache_headers(response: Any) -> Any:
     """Add cache headers to speed up static asset delivery."""
@@ -0,0 +1,216 @@
+"""Admission control for the click ingestion path.
+
+Each worker tracks its in-flight click writes and the latency of its commits.
+When either exceeds the configured limits, new clicks are shed with a 503
+instead of queueing behind a slow database and tying up the worker. Clicks
+without an inferred pass are shed first: they hit half the in-flight limit and
+the plain latency threshold, while clicks carrying ``inferred_state`` are only
+shed at the full in-flight limit or twice the latency threshold.
+
+The latency signal is the larger of the average commit time over the last
+``LATENCY_WINDOW_SECONDS`` and the age of the oldest write still running, so a
+stalled database keeps shedding even though no commit finishes. When the
+window has drained, the last reading is kept and a single probe click is let
+through per window to refresh it; a fast probe ends the shedding.
+
+The in-flight cap only matters with threaded workers (``gunicorn --threads N``
+or ``-k gthread``); sync workers handle one request at a time and are guarded
+by the latency signal alone.
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from flask import current_app, g
+
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_LATENCY_THRESHOLD_MS = 500.0
+DEFAULT_RETRY_AFTER_SECONDS = 2
+# Commits finishing within this window are averaged; once it drains, one probe
+# per window is admitted to replace the last (possibly stale) reading.
+LATENCY_WINDOW_SECONDS = 10.0
+_LATENCY_SAMPLES = 50
+
+
+class _IngestionAdmission:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tokens = itertools.count()
+        self._slots: dict[int, float] = {}
+        self._latencies: deque[tuple[float, float]] = deque(maxlen=_LATENCY_SAMPLES)
+        self._last_latency: Optional[float] = None
+        self._last_probe = -math.inf
+        self._admitted = 0
+        self._shed: dict[str, int] = {"in_flight": 0, "latency": 0}
+        self._shed_by_priority: dict[str, int] = {"inferred": 0, "plain": 0}
+
+    def _recent_latency(self, now: float) -> Optional[float]:
+        while self._latencies and now - self._latencies[0][0] > LATENCY_WINDOW_SECONDS:
+            self._latencies.popleft()
+        if not self._latencies:
+            return None
+        return sum(duration for _, duration in self._latencies) / len(self._latencies)
+
+    def _running_latency(self, now: float) -> Optional[float]:
+        if not self._slots:
+            return None
+        return now - min(self._slots.values())
+
+    def try_acquire(
+        self, prioritized: bool, max_in_flight: int, latency_threshold: float
+    ) -> tuple[Optional[int], Optional[str]]:
+        """Reserve an in-flight slot.
+
+        Returns ``(token, None)`` when admitted and ``(None, reason)`` when shed;
+        the token must be passed to ``release``.
+        """
+
+        limit = max_in_flight if prioritized else max(1, max_in_flight // 2)
+        threshold = latency_threshold * 2 if prioritized else latency_threshold
+
+        with self._lock:
+            now = time.monotonic()
+            reason: Optional[str] = None
+            recent = self._recent_latency(now)
+            running = self._running_latency(now)
+            if len(self._slots) >= limit:
+                reason = "in_flight"
+            elif max(recent or 0.0, running or 0.0) > threshold:
+                reason = "latency"
+            elif (
+                recent is None
+                and self._last_latency is not None
+                and self._last_latency > threshold
+            ):
+                # The last commit was slow and nothing newer is known: let one
+                # probe through per window instead of reopening the floodgates.
+                if now - self._last_probe < LATENCY_WINDOW_SECONDS:
+                    reason = "latency"
+                else:
+                    self._last_probe = now
+
+            if reason is None:
+                token = next(self._tokens)
+                self._slots[token] = now
+                self._admitted += 1
+                return token, None
+
+            self._shed[reason] += 1
+            self._shed_by_priority["inferred" if prioritized else "plain"] += 1
+            return None, reason
+
+    def release(self, token: int) -> None:
+        with self._lock:
+            self._slots.pop(token, None)
+
+    def record_commit(self, duration: float) -> None:
+        with self._lock:
+            self._latencies.append((time.monotonic(), duration))
+            self._last_latency = duration
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            latency = self._recent_latency(now)
+            running = self._running_latency(now)
+            return {
+                "in_flight": len(self._slots),
+                "commit_latency_ms": round(latency * 1000, 1) if latency is not None else None,
+                "oldest_in_flight_ms": round(running * 1000, 1) if running is not None else None,
+                "last_commit_latency_ms": (
+                    round(self._last_latency * 1000, 1) if self._last_latency is not None else None
+                ),
+                "admitted": self._admitted,
+                "shed": dict(self._shed),
+                "shed_by_priority": dict(self._shed_by_priority),
+            }
+
+
+_ADMISSION = _IngestionAdmission()
+
+
+def _get_admission_limits() -> tuple[int, float, int]:
+    """Return validated ``(max_in_flight, latency_threshold_s, retry_after_s)``."""
+
+    max_raw = current_app.config.get("INGESTION_MAX_IN_FLIGHT")
+    try:
+        max_in_flight = int(max_raw) if max_raw is not None else DEFAULT_MAX_IN_FLIGHT
+        if max_in_flight < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        current_app.logger.warning(
+            "Invalid INGESTION_MAX_IN_FLIGHT=%r, falling back to default", max_raw
+        )
+        max_in_flight = DEFAULT_MAX_IN_FLIGHT
+
+    latency_raw = current_app.config.get("INGESTION_LATENCY_THRESHOLD_MS")
+    try:
+        latency_ms = (
+            float(latency_raw) if latency_raw is not None else DEFAULT_LATENCY_THRESHOLD_MS
+        )
+        if latency_ms <= 0 or not math.isfinite(latency_ms):
+            raise ValueError
+    except (TypeError, ValueError):
+        current_app.logger.warning(
+            "Invalid INGESTION_LATENCY_THRESHOLD_MS=%r, falling back to default", latency_raw
+        )
+        latency_ms = DEFAULT_LATENCY_THRESHOLD_MS
+
+    retry_raw = current_app.config.get("INGESTION_RETRY_AFTER_SECONDS")
+    try:
+        retry_after = int(retry_raw) if retry_raw is not None else DEFAULT_RETRY_AFTER_SECONDS
+        if retry_after < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        current_app.logger.warning(
+            "Invalid INGESTION_RETRY_AFTER_SECONDS=%r, falling back to default", retry_raw
+        )
+        retry_after = DEFAULT_RETRY_AFTER_SECONDS
+
+    return max_in_flight, latency_ms / 1000, retry_after
+
+
+def try_admit_click(prioritized: bool) -> Optional[int]:
+    """Admit a click write or return the ``Retry-After`` seconds when shed.
+
+    Callers that are admitted must call ``release_click`` once the write is done.
+    """
+
+    max_in_flight, latency_threshold, retry_after = _get_admission_limits()
+    token, reason = _ADMISSION.try_acquire(prioritized, max_in_flight, latency_threshold)
+    if token is not None:
+        g._admission_token = token
+        return None
+
+    current_app.logger.warning(
+        "Shedding %s click (%s limit exceeded): %s",
+        "inferred" if prioritized else "plain",
+        reason,
+        _ADMISSION.snapshot(),
+    )
+    return retry_after
+
+
+def release_click() -> None:
+    """Free the in-flight slot taken by ``try_admit_click``."""
+
+    token = g.pop("_admission_token", None)
+    if token is not None:
+        _ADMISSION.release(token)
+
+
+def record_commit_latency(duration: float) -> None:
+    """Feed a commit duration in seconds into the latency signal."""
+
+    _ADMISSION.record_commit(duration)
+
+
+def get_admission_stats() -> dict[str, Any]:
+    """Return the current worker's admission counters and latency."""
+
+    return _ADMISSION.snapshot()
@@ -2,15 +2,22 @@ from __future__ import annotations
 
 from datetime import date, datetime, time, timedelta, timezone
 from itertools import groupby
-from typing import Iterable, List, Sequence
+from typing import Iterable, List, Optional, Sequence
 
+import sqlalchemy as sa
 from flask import current_app
 
+from ..db_routing import replica_read
 from ..extensions import db
 from ..models import TrafficLightPass, TrafficLightRange
 
+# Rows fetched per round-trip while streaming range history.
+HISTORY_FETCH_SIZE = 500
+
+
+def normalize_day(target_day: date | None) -> date:
+    """Return ``target_day`` or, when omitted, the previous UTC day."""
 
-def _normalize_day(target_day: date | None) -> date:
     if target_day:
         return target_day
 
@@ -60,7 +67,7 @@ def aggregate_passes_for_day(target_day: date | None = None) -> Sequence[Traffic
     results idempotent.
     """
 
-    day = _normalize_day(target_day)
+    day = normalize_day(target_day)
     start, end = _day_bounds(day)
 
     query = (
@@ -89,10 +96,11 @@ def aggregate_passes_for_day(target_day: date | None = None) -> Sequence[Traffic
     return ranges
 
 
+@replica_read
 def get_ranges_for_light(light_identifier: str, day: date | None = None) -> List[TrafficLightRange]:
     """Fetch aggregated ranges for a specific light and day (defaults to previous UTC day)."""
 
-    normalized_day = _normalize_day(day)
+    normalized_day = normalize_day(day)
 
     return (
         TrafficLightRange.query.filter(
@@ -102,3 +110,40 @@ def get_ranges_for_light(light_identifier: str, day: date | None = None) -> List
         .order_by(TrafficLightRange.start_time)
         .all()
     )
+
+
+@replica_read
+def get_range_history(
+    light_identifier: str,
+    start_day: date,
+    end_day: date,
+    limit: int,
+    after: Optional[tuple[date, datetime, int]] = None,
+) -> sa.Result:
+    """Stream ranges for a light across ``start_day``..``end_day`` (inclusive).
+
+    Rows are ordered by ``(day, start_time, id)`` and resumed strictly after the
+    ``after`` key, so every page is an index range scan on
+    ``ix_traffic_light_range_history`` regardless of how deep it is. At most
+    ``limit`` rows are returned, as lightweight rows fetched in batches rather
+    than ORM objects loaded all at once.
+    """
+
+    key = (TrafficLightRange.day, TrafficLightRange.start_time, TrafficLightRange.id)
+    statement = sa.select(
+        TrafficLightRange.id,
+        TrafficLightRange.color,
+        TrafficLightRange.start_time,
+        TrafficLightRange.end_time,
+        TrafficLightRange.day,
+    ).where(
+        TrafficLightRange.light_identifier == light_identifier,
+        TrafficLightRange.day >= start_day,
+        TrafficLightRange.day <= end_day,
+    )
+    if after is not None:
+        statement = statement.where(sa.tuple_(*key) > sa.tuple_(*after))
+
+    statement = statement.order_by(*key).limit(limit)
+
+    return db.session.execute(statement.execution_options(yield_per=HISTORY_FETCH_SIZE))
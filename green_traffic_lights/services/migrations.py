@@ -0,0 +1,180 @@
+"""One-off schema migrations that ``db.create_all()`` cannot apply."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import sqlalchemy as sa
+from flask import current_app
+
+from ..extensions import db
+from ..models.types import PackedFloatArray
+
+_PASS_TABLE = "traffic_light_pass"
+_TEMP_COLUMN = "speed_profile_packed"
+_PACKED_FLAG = "speed_profile_packed"
+
+
+def _get_pass_columns() -> dict[str, dict[str, Any]]:
+    inspector = sa.inspect(db.engine)
+    return {column["name"]: column for column in inspector.get_columns(_PASS_TABLE)}
+
+
+def speed_profile_is_packed(refresh: bool = False) -> bool:
+    """Return whether ``traffic_light_pass.speed_profile`` is already binary.
+
+    The answer is cached per app (i.e. per worker); ``refresh`` re-inspects the
+    primary, e.g. after a write failed because the migration ran meanwhile.
+    """
+
+    packed = None if refresh else current_app.extensions.get(_PACKED_FLAG)
+    if packed is None:
+        column = _get_pass_columns().get("speed_profile")
+        packed = column is not None and isinstance(column["type"], sa.LargeBinary)
+        current_app.extensions[_PACKED_FLAG] = packed
+    return packed
+
+
+def _convert_batch(
+    connection: sa.engine.Connection, last_id: int, batch_size: int
+) -> tuple[int, int]:
+    """Pack one batch of JSON profiles after ``last_id``.
+
+    Returns ``(converted, last_id)``; ``last_id`` is unchanged once no rows
+    are left.
+    """
+
+    rows = connection.execute(
+        sa.text(
+            f"SELECT id, speed_profile FROM {_PASS_TABLE} "
+            "WHERE id > :last_id AND speed_profile IS NOT NULL ORDER BY id LIMIT :limit"
+        ),
+        {"last_id": last_id, "limit": batch_size},
+    ).all()
+    if not rows:
+        return 0, last_id
+
+    packed_type = PackedFloatArray()
+    updates = []
+    for row_id, raw_profile in rows:
+        if isinstance(raw_profile, (bytes, bytearray, memoryview)):
+            # Already packed by the new model before the migration ran
+            # (SQLite stores the blob in the JSON column as-is).
+            updates.append({"id": row_id, "packed": bytes(raw_profile)})
+            continue
+
+        # SQLite returns JSON columns as text; psycopg2 decodes them.
+        profile = json.loads(raw_profile) if isinstance(raw_profile, str) else raw_profile
+        if profile is not None:
+            updates.append({"id": row_id, "packed": packed_type.encode(profile)})
+
+    if updates:
+        connection.execute(
+            sa.text(f"UPDATE {_PASS_TABLE} SET {_TEMP_COLUMN} = :packed WHERE id = :id"),
+            updates,
+        )
+    return len(updates), rows[-1][0]
+
+
+def migrate_speed_profiles(batch_size: int = 500) -> int:
+    """Convert ``traffic_light_pass.speed_profile`` from JSON to packed blobs.
+
+    A binary column is added next to the JSON one, rows are converted in
+    batches keyed by ``id``, and the new column then replaces the old one on
+    the primary. Returns the number of rows converted by this run; databases
+    that already use the binary column are left untouched.
+
+    Adding the column, every batch and the final swap are separate short
+    transactions, so the table is only locked exclusively (PostgreSQL takes an
+    ACCESS EXCLUSIVE lock for ``ALTER TABLE``) for the two DDL steps. Rows
+    inserted while the batches run are converted inside the swap transaction.
+    The migration is restartable: a rerun resumes after the highest ``id``
+    already packed, and a run interrupted after dropping the JSON column only
+    finishes the rename.
+    """
+
+    engine = db.engine
+    columns = _get_pass_columns()
+    current = columns.get("speed_profile")
+    has_temp_column = _TEMP_COLUMN in columns
+
+    if current is None and has_temp_column:
+        with engine.begin() as connection:
+            connection.execute(
+                sa.text(f"ALTER TABLE {_PASS_TABLE} RENAME COLUMN {_TEMP_COLUMN} TO speed_profile")
+            )
+        current_app.extensions[_PACKED_FLAG] = True
+        current_app.logger.info("Finished interrupted speed_profile migration")
+        return 0
+
+    if current is not None and isinstance(current["type"], sa.LargeBinary):
+        current_app.extensions[_PACKED_FLAG] = True
+        current_app.logger.info("speed_profile already uses packed storage; nothing to do")
+        return 0
+
+    if has_temp_column:
+        with engine.connect() as connection:
+            last_id = connection.execute(
+                sa.text(f"SELECT MAX(id) FROM {_PASS_TABLE} WHERE {_TEMP_COLUMN} IS NOT NULL")
+            ).scalar() or 0
+        current_app.logger.info("Resuming speed_profile migration after id %d", last_id)
+    else:
+        column_ddl = sa.LargeBinary().compile(dialect=engine.dialect)
+        with engine.begin() as connection:
+            connection.execute(
+                sa.text(f"ALTER TABLE {_PASS_TABLE} ADD COLUMN {_TEMP_COLUMN} {column_ddl}")
+            )
+        last_id = 0
+
+    converted = 0
+    while True:
+        with engine.begin() as connection:
+            batch_converted, next_id = _convert_batch(connection, last_id, batch_size)
+        converted += batch_converted
+        if next_id == last_id:
+            break
+        last_id = next_id
+
+    with engine.begin() as connection:
+        # Block writes (reads stay allowed) until the swap commits, then catch
+        # up on rows inserted since the last batch.
+        if engine.dialect.name == "postgresql":
+            connection.execute(sa.text(f"LOCK TABLE {_PASS_TABLE} IN EXCLUSIVE MODE"))
+        while True:
+            batch_converted, next_id = _convert_batch(connection, last_id, batch_size)
+            converted += batch_converted
+            if next_id == last_id:
+                break
+            last_id = next_id
+
+        connection.execute(sa.text(f"ALTER TABLE {_PASS_TABLE} DROP COLUMN speed_profile"))
+        connection.execute(
+            sa.text(f"ALTER TABLE {_PASS_TABLE} RENAME COLUMN {_TEMP_COLUMN} TO speed_profile")
+        )
+
+    current_app.extensions[_PACKED_FLAG] = True
+    current_app.logger.info("Converted %d speed profiles to packed storage", converted)
+    return converted
+
+
+def create_missing_indexes() -> int:
+    """Create model indexes missing from existing tables.
+
+    ``db.create_all()`` only creates indexes together with new tables, so
+    indexes added to models later are created here on the primary. This is a
+    CLI step rather than a startup hook: a plain ``CREATE INDEX`` blocks writes
+    to the table while it builds. Returns the number of indexes created.
+    """
+
+    engine = db.engine
+    inspector = sa.inspect(engine)
+    created = 0
+    for table in db.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            current_app.logger.info("Creating index %s on %s", index.name, table.name)
+            index.create(bind=engine)
+            created += 1
+    return created
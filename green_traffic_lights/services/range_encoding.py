@@ -0,0 +1,112 @@
+"""Compact encodings for aggregated traffic light ranges.
+
+Both encodings share the same layout: a per-light header (identifier, day and
+range count), a color bitmap where bit ``i`` is set when range ``i`` is green,
+and two integer arrays of seconds since UTC midnight of the day. ``starts`` is
+delta-encoded against the previous start (the first against midnight) and
+``ends`` against the start of the same range, so typical values stay small.
+"""
+from __future__ import annotations
+
+import base64
+import struct
+from datetime import date, datetime, time, timezone
+from typing import Any, Sequence
+
+from ..models import TrafficLightRange
+
+COMPACT_JSON_MIMETYPE = "application/vnd.greenlights.ranges+json"
+BINARY_MIMETYPE = "application/vnd.greenlights.ranges"
+
+BINARY_MAGIC = b"GTLR"
+BINARY_VERSION = 1
+# magic, version, light identifier length (bytes), day as proleptic ordinal.
+_BINARY_HEADER = struct.Struct(">4sBHI")
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns; the
+    # stored values are UTC, so attach the zone instead of converting.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _delta_arrays(
+    ranges: Sequence[TrafficLightRange], day: date
+) -> tuple[bytes, list[int], list[int]]:
+    midnight = _midnight(day)
+    bitmap = bytearray((len(ranges) + 7) // 8)
+    starts: list[int] = []
+    ends: list[int] = []
+
+    previous_start = 0
+    for position, range_ in enumerate(ranges):
+        if range_.color == "green":
+            bitmap[position >> 3] |= 1 << (position & 7)
+
+        start = int((_as_utc(range_.start_time) - midnight).total_seconds())
+        end = int((_as_utc(range_.end_time) - midnight).total_seconds())
+        starts.append(start - previous_start)
+        ends.append(end - start)
+        previous_start = start
+
+    return bytes(bitmap), starts, ends
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    # Zigzag first so that an occasional negative delta stays one or two bytes.
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def encode_ranges_compact(
+    light_identifier: str, day: date, ranges: Sequence[TrafficLightRange]
+) -> dict[str, Any]:
+    """Encode ranges as compact JSON with a base64 color bitmap and delta arrays."""
+
+    bitmap, starts, ends = _delta_arrays(ranges, day)
+
+    return {
+        "light_identifier": light_identifier,
+        "day": day.isoformat(),
+        "count": len(ranges),
+        "green_bitmap": base64.b64encode(bitmap).decode("ascii"),
+        "starts": starts,
+        "ends": ends,
+    }
+
+
+def encode_ranges_binary(
+    light_identifier: str, day: date, ranges: Sequence[TrafficLightRange]
+) -> bytes:
+    """Encode ranges in the binary layout.
+
+    The header is ``GTLR``, a version byte, a big-endian ``u16`` identifier
+    length, a ``u32`` day ordinal and the UTF-8 identifier. It is followed by
+    the range count as a varint, the color bitmap, and the start and end deltas
+    as zigzag varints.
+    """
+
+    bitmap, starts, ends = _delta_arrays(ranges, day)
+    identifier_bytes = light_identifier.encode("utf-8")
+
+    buffer = bytearray(
+        _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(identifier_bytes), day.toordinal())
+    )
+    buffer += identifier_bytes
+    _write_varint(buffer, len(ranges))
+    buffer += bitmap
+    for value in starts:
+        _write_varint(buffer, value)
+    for value in ends:
+        _write_varint(buffer, value)
+
+    return bytes(buffer)
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import json
 import math
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Iterable, Optional, Tuple
 
@@ -11,12 +14,96 @@ DEFAULT_TRAFFIC_LIGHTS_FILENAME = "light_traffics.json"
 # Default to a 50 m radius to filter out only the nearest, directly visible lights
 # while still allowing legitimate remote activations.
 DEFAULT_DISTANCE_THRESHOLD_METERS = 50.0
+REGION_MANIFEST_FILENAME = "regions.json"
+# Regions untouched for this long are dropped from the worker's memory.
+DEFAULT_REGION_IDLE_SECONDS = 900.0
+# Upper bound on the number of lights kept loaded across all regions per worker.
+DEFAULT_REGION_MAX_LIGHTS = 200_000
+# Roughly 1.1 km of latitude per grid cell; small enough that a 50 m lookup only
+# touches a handful of cells, large enough to keep the cell dict compact.
+_GRID_CELL_DEGREES = 0.01
+_METERS_PER_DEGREE_LAT = 111_320.0
 
 _TRAFFIC_LIGHTS: list[Tuple[float, float]] = []
 _TRAFFIC_LIGHTS_MTIME: Optional[float] = None
 _TRAFFIC_LIGHTS_PATH: Optional[Path] = None
 
 
+@dataclass
+class _TrafficLightIndex:
+    """Uniform lat/lon grid over a region's lights for nearby lookups."""
+
+    lights: list[Tuple[float, float]]
+    cells: dict[Tuple[int, int], list[Tuple[float, float]]]
+
+    @classmethod
+    def build(cls, lights: list[Tuple[float, float]]) -> "_TrafficLightIndex":
+        cells: dict[Tuple[int, int], list[Tuple[float, float]]] = {}
+        for light in lights:
+            cells.setdefault(_grid_cell(*light), []).append(light)
+        return cls(lights=lights, cells=cells)
+
+    def nearest_distance(self, lat: float, lon: float, radius_m: float) -> Optional[float]:
+        """Return the distance to the nearest light within ``radius_m``.
+
+        Only the cells overlapping ``radius_m`` around the point are scanned, so
+        the cost does not depend on the region size. When no light is within
+        the radius, ``math.inf`` is returned instead of an exact distance;
+        ``None`` means the region has no lights at all.
+        """
+
+        if not self.lights:
+            return None
+
+        lat_margin, lon_margin = _degree_margins(lat, radius_m)
+        min_row, min_col = _grid_cell(lat - lat_margin, lon - lon_margin)
+        max_row, max_col = _grid_cell(lat + lat_margin, lon + lon_margin)
+
+        nearby = (
+            light
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+            for light in self.cells.get((row, col), ())
+        )
+        nearest = _nearest_distance(lat, lon, nearby)
+        if nearest is not None and nearest <= radius_m:
+            return nearest
+
+        return math.inf
+
+
+@dataclass
+class _Region:
+    """A regional dataset routed to by bounding box and loaded on demand."""
+
+    name: str
+    path: Path
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+    index: Optional[_TrafficLightIndex] = field(default=None, repr=False)
+    mtime: Optional[float] = None
+    last_used: float = 0.0
+
+    def contains(self, lat: float, lon: float, lat_margin: float, lon_margin: float) -> bool:
+        return (
+            self.min_lat - lat_margin <= lat <= self.max_lat + lat_margin
+            and self.min_lon - lon_margin <= lon <= self.max_lon + lon_margin
+        )
+
+    def unload(self) -> None:
+        self.index = None
+        self.mtime = None
+
+
+_REGIONS: list[_Region] = []
+_REGIONS_MTIME: Optional[float] = None
+_REGIONS_DIR: Optional[Path] = None
+# Guards the manifest, region loads and eviction across request threads.
+_REGIONS_LOCK = threading.Lock()
+
+
 def _get_traffic_lights_path() -> Path:
     """Return an absolute path to the traffic lights JSON file.
 
@@ -36,6 +123,49 @@ def _get_traffic_lights_path() -> Path:
     return Path(current_app.root_path) / DEFAULT_TRAFFIC_LIGHTS_FILENAME
 
 
+def _get_traffic_lights_dir() -> Optional[Path]:
+    """Return an absolute path to the regional datasets directory, if configured.
+
+    Relative ``TRAFFIC_LIGHTS_DIR`` values are rooted at ``current_app.root_path``
+    to match ``TRAFFIC_LIGHTS_FILE``.
+    """
+
+    configured = current_app.config.get("TRAFFIC_LIGHTS_DIR")
+    if not configured:
+        return None
+
+    configured_path = Path(configured)
+    if not configured_path.is_absolute():
+        configured_path = Path(current_app.root_path) / configured_path
+    return configured_path
+
+
+def _parse_traffic_light_entries(raw_data: list[Any], source: Path) -> list[Tuple[float, float]]:
+    """Extract ``(lat, lon)`` pairs from raw JSON entries, skipping malformed ones."""
+
+    parsed: list[Tuple[float, float]] = []
+    discarded = 0
+    for entry in raw_data:
+        if not isinstance(entry, dict):
+            discarded += 1
+            continue
+        try:
+            lat = float(entry["lat"])
+            lon = float(entry["lon"])
+        except (KeyError, TypeError, ValueError):
+            discarded += 1
+            continue
+
+        parsed.append((lat, lon))
+
+    if discarded:
+        current_app.logger.warning(
+            "Discarded %d malformed traffic light entries from %s", discarded, source
+        )
+
+    return parsed
+
+
 def _load_traffic_lights() -> list[Tuple[float, float]]:
     """Load traffic light coordinates from the JSON file with mtime caching."""
 
@@ -83,30 +213,266 @@ def _load_traffic_lights() -> list[Tuple[float, float]]:
         )
         return []
 
-    parsed: list[Tuple[float, float]] = []
+    _TRAFFIC_LIGHTS = _parse_traffic_light_entries(raw_data, traffic_lights_file)
+    _TRAFFIC_LIGHTS_MTIME = mtime
+
+    return _TRAFFIC_LIGHTS
+
+
+def _parse_region_manifest(raw_data: Any, regions_dir: Path) -> list[_Region]:
+    """Build regions from manifest entries of ``{"name", "file", "bbox"}``.
+
+    ``bbox`` is ``[min_lat, min_lon, max_lat, max_lon]``; ``file`` is resolved
+    relative to the regions directory.
+    """
+
+    if not isinstance(raw_data, list):
+        current_app.logger.warning(
+            "Unexpected region manifest data type %s; expected a list of regions",
+            type(raw_data).__name__,
+        )
+        return []
+
+    regions: list[_Region] = []
     discarded = 0
     for entry in raw_data:
         if not isinstance(entry, dict):
             discarded += 1
             continue
         try:
-            lat = float(entry["lat"])
-            lon = float(entry["lon"])
+            name = str(entry["name"])
+            region_file = Path(entry["file"])
+            min_lat, min_lon, max_lat, max_lon = (float(value) for value in entry["bbox"])
         except (KeyError, TypeError, ValueError):
             discarded += 1
             continue
 
-        parsed.append((lat, lon))
+        if min_lat > max_lat or min_lon > max_lon:
+            discarded += 1
+            continue
+
+        if not region_file.is_absolute():
+            region_file = regions_dir / region_file
+
+        regions.append(
+            _Region(
+                name=name,
+                path=region_file,
+                min_lat=min_lat,
+                min_lon=min_lon,
+                max_lat=max_lat,
+                max_lon=max_lon,
+            )
+        )
 
     if discarded:
         current_app.logger.warning(
-            "Discarded %d malformed traffic light entries from %s", discarded, traffic_lights_file
+            "Discarded %d malformed region entries from %s", discarded, regions_dir
         )
 
-    _TRAFFIC_LIGHTS = parsed
-    _TRAFFIC_LIGHTS_MTIME = mtime
+    return regions
 
-    return _TRAFFIC_LIGHTS
+
+def _load_regions(regions_dir: Path) -> list[_Region]:
+    """Load the region manifest with mtime caching.
+
+    Only bounding boxes are read here; the lights of each region are loaded by
+    ``_load_region_index`` the first time a click falls inside it. Callers
+    must hold ``_REGIONS_LOCK``, as for ``_load_region_index`` and
+    ``_evict_regions``.
+    """
+
+    global _REGIONS, _REGIONS_MTIME, _REGIONS_DIR
+
+    manifest_file = regions_dir / REGION_MANIFEST_FILENAME
+
+    if _REGIONS_DIR != regions_dir:
+        _REGIONS = []
+        _REGIONS_MTIME = None
+        _REGIONS_DIR = regions_dir
+
+    try:
+        mtime = manifest_file.stat().st_mtime
+
+        if _REGIONS and _REGIONS_MTIME == mtime:
+            return _REGIONS
+
+        raw_data = json.loads(manifest_file.read_text(encoding="utf-8"))
+
+    except FileNotFoundError:
+        if _REGIONS:
+            current_app.logger.warning(
+                "Region manifest missing; using cached regions from previous load"
+            )
+            return _REGIONS
+
+        current_app.logger.error("Region manifest not found: %s", manifest_file)
+        return []
+    except json.JSONDecodeError:
+        current_app.logger.error("Region manifest contains invalid JSON: %s", manifest_file)
+        if _REGIONS:
+            _REGIONS_MTIME = mtime
+            current_app.logger.warning("Using cached regions; latest manifest is malformed")
+            return _REGIONS
+        return []
+
+    _REGIONS = _parse_region_manifest(raw_data, regions_dir)
+    _REGIONS_MTIME = mtime
+
+    return _REGIONS
+
+
+def _load_region_index(region: _Region) -> Optional[_TrafficLightIndex]:
+    """Load (or reload on mtime change) the lights and grid index for a region."""
+
+    try:
+        mtime = region.path.stat().st_mtime
+
+        if region.index is not None and region.mtime == mtime:
+            return region.index
+
+        raw_data = json.loads(region.path.read_text(encoding="utf-8"))
+
+    except FileNotFoundError:
+        if region.index is not None:
+            current_app.logger.warning(
+                "Region %s file missing; using cached data from previous load", region.name
+            )
+            return region.index
+
+        current_app.logger.error("Region %s file not found: %s", region.name, region.path)
+        return None
+    except json.JSONDecodeError:
+        current_app.logger.error(
+            "Region %s file contains invalid JSON: %s", region.name, region.path
+        )
+        if region.index is not None:
+            region.mtime = mtime
+            current_app.logger.warning(
+                "Using cached lights for region %s; latest file is malformed", region.name
+            )
+            return region.index
+        return None
+
+    if not isinstance(raw_data, list):
+        current_app.logger.warning(
+            "Unexpected data type %s in region %s; expected a list of entries",
+            type(raw_data).__name__,
+            region.name,
+        )
+        return None
+
+    region.index = _TrafficLightIndex.build(_parse_traffic_light_entries(raw_data, region.path))
+    region.mtime = mtime
+    current_app.logger.info(
+        "Loaded %d traffic lights for region %s", len(region.index.lights), region.name
+    )
+
+    return region.index
+
+
+def _get_region_limits() -> Tuple[float, int]:
+    """Return validated ``(idle_seconds, max_lights)`` for the region cache."""
+
+    idle_raw = current_app.config.get("TRAFFIC_LIGHTS_REGION_IDLE_SECONDS")
+    try:
+        idle_seconds = float(idle_raw) if idle_raw is not None else DEFAULT_REGION_IDLE_SECONDS
+        if idle_seconds < 0 or not math.isfinite(idle_seconds):
+            raise ValueError
+    except (TypeError, ValueError):
+        current_app.logger.warning(
+            "Invalid TRAFFIC_LIGHTS_REGION_IDLE_SECONDS=%r, falling back to default", idle_raw
+        )
+        idle_seconds = DEFAULT_REGION_IDLE_SECONDS
+
+    budget_raw = current_app.config.get("TRAFFIC_LIGHTS_REGION_MAX_LIGHTS")
+    try:
+        max_lights = int(budget_raw) if budget_raw is not None else DEFAULT_REGION_MAX_LIGHTS
+        if max_lights < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        current_app.logger.warning(
+            "Invalid TRAFFIC_LIGHTS_REGION_MAX_LIGHTS=%r, falling back to default", budget_raw
+        )
+        max_lights = DEFAULT_REGION_MAX_LIGHTS
+
+    return idle_seconds, max_lights
+
+
+def _evict_regions(regions: list[_Region], active: set[str], now: float) -> None:
+    """Unload idle regions, then least recently used ones while over budget.
+
+    Regions named in ``active`` are serving the current lookup and are kept.
+    """
+
+    idle_seconds, max_lights = _get_region_limits()
+
+    loaded = [region for region in regions if region.index is not None]
+    for region in loaded:
+        if region.name not in active and now - region.last_used > idle_seconds:
+            current_app.logger.info("Evicting idle traffic light region %s", region.name)
+            region.unload()
+
+    loaded = [region for region in regions if region.index is not None]
+    total_lights = sum(len(region.index.lights) for region in loaded)
+    for region in sorted(loaded, key=lambda item: item.last_used):
+        if total_lights <= max_lights:
+            break
+        if region.name in active:
+            continue
+        current_app.logger.info(
+            "Evicting traffic light region %s to stay within %d lights", region.name, max_lights
+        )
+        total_lights -= len(region.index.lights)
+        region.unload()
+
+
+def _nearest_region_distance(lat: float, lon: float, radius_m: float) -> Optional[float]:
+    """Return the nearest light distance using the regional datasets.
+
+    Returns ``None`` when no regional data is available at all and ``math.inf``
+    when no light is within ``radius_m``, including points outside every
+    region's bounding box (padded by ``radius_m`` so lights on a region edge
+    are still reachable).
+    """
+
+    regions_dir = _get_traffic_lights_dir()
+    if regions_dir is None:
+        return None
+
+    lat_margin, lon_margin = _degree_margins(lat, radius_m)
+    with _REGIONS_LOCK:
+        regions = _load_regions(regions_dir)
+        if not regions:
+            return None
+
+        candidates = [
+            region for region in regions if region.contains(lat, lon, lat_margin, lon_margin)
+        ]
+
+        now = time.monotonic()
+        indexes = []
+        for region in candidates:
+            region.last_used = now
+            index = _load_region_index(region)
+            if index is not None:
+                indexes.append(index)
+
+        _evict_regions(regions, {region.name for region in candidates}, now)
+
+    # The indexes are immutable once built, so an eviction by another thread
+    # only drops the cache's reference and the lookups can run unlocked.
+    nearest: Optional[float] = None
+    for index in indexes:
+        distance = index.nearest_distance(lat, lon, radius_m)
+        if distance is not None and (nearest is None or distance < nearest):
+            nearest = distance
+
+    if not candidates:
+        return math.inf
+    if not indexes:
+        return None
+    return nearest
 
 
 def _get_distance_threshold() -> float:
@@ -149,6 +515,20 @@ def _haversine_distance_meters(lat1: float, lon1: float, lat2: float, lon2: floa
     return radius_m * c
 
 
+def _degree_margins(lat: float, meters: float) -> Tuple[float, float]:
+    """Convert a distance in meters into ``(lat, lon)`` degree offsets at ``lat``."""
+
+    lat_margin = meters / _METERS_PER_DEGREE_LAT
+    # Clamp the cosine so points near the poles do not blow up the longitude span.
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    lon_margin = min(meters / (_METERS_PER_DEGREE_LAT * cos_lat), 360.0)
+    return lat_margin, lon_margin
+
+
+def _grid_cell(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / _GRID_CELL_DEGREES), math.floor(lon / _GRID_CELL_DEGREES)
+
+
 def _nearest_distance(lat: float, lon: float, lights: Iterable[Tuple[float, float]]) -> Optional[float]:
     """Return the distance in meters to the nearest traffic light."""
 
@@ -162,9 +542,12 @@ def _nearest_distance(lat: float, lon: float, lights: Iterable[Tuple[float, floa
 
 
 def validate_click_distance(lat: float, lon: float) -> Optional[Tuple[dict[str, Any], int]]:
-    traffic_lights = _load_traffic_lights()
     distance_threshold = _get_distance_threshold()
-    nearest_distance = _nearest_distance(lat, lon, traffic_lights)
+
+    if _get_traffic_lights_dir() is not None:
+        nearest_distance = _nearest_region_distance(lat, lon, distance_threshold)
+    else:
+        nearest_distance = _nearest_distance(lat, lon, _load_traffic_lights())
 
     if nearest_distance is None:
         current_app.logger.warning(
@@ -173,12 +556,13 @@ def validate_click_distance(lat: float, lon: float) -> Optional[Tuple[dict[str,
         return None
 
     if nearest_distance > distance_threshold:
-        return (
-            {
-                "error": "Вы находитесь слишком далеко от ближайшего светофора для отправки сигнала.",
-                "details": {"distance_m": round(nearest_distance, 1)},
-            },
-            400,
-        )
+        payload: dict[str, Any] = {
+            "error": "Вы находитесь слишком далеко от ближайшего светофора для отправки сигнала.",
+        }
+        # Regional lookups only search within the threshold, so clicks beyond
+        # it have no exact distance to report.
+        if math.isfinite(nearest_distance):
+            payload["details"] = {"distance_m": round(nearest_distance, 1)}
+        return payload, 400
 
     return None
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from green_traffic_lights.models.types import PackedFloatArray, PackedProfile
+
+
+def _result_processor(dialect):
+    column_type = PackedFloatArray()
+    return column_type.dialect_impl(dialect).result_processor(dialect, None)
+
+
+@pytest.mark.parametrize(
+    "legacy_value",
+    [[12.5, 13.0], {"a": 1}, [1, 2, 3], "text"],
+)
+def test_psycopg2_reads_unmigrated_json_values(legacy_value):
+    process = _result_processor(postgresql.psycopg2.dialect())
+
+    assert process(legacy_value) == legacy_value
+
+
+def test_psycopg2_reads_packed_memoryview():
+    column_type = PackedFloatArray()
+    process = _result_processor(postgresql.psycopg2.dialect())
+
+    profile = process(memoryview(column_type.encode([10.5, 11.0, 11.5])))
+
+    assert isinstance(profile, PackedProfile)
+    assert profile.tolist() == [10.5, 11.0, 11.5]
+
+
+def test_sqlite_reads_unmigrated_json_text_and_blobs():
+    column_type = PackedFloatArray()
+    process = _result_processor(sqlite.dialect())
+
+    assert process('[12.5, 13.0]') == [12.5, 13.0]
+    assert process(column_type.encode({"a": 1})) == {"a": 1}
+    assert process(None) is None